@@ -1,14 +1,43 @@
 from flask import Flask, request, Response, jsonify
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import re
 import os
+import time
+import json
+import atexit
+import hashlib
+import importlib
 from dotenv import load_dotenv
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ciso8601
+
+    def _parse_iso(value):
+        return ciso8601.parse_datetime(value)
+
+except ImportError:
+
+    def _parse_iso(value):
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
 from datetime import datetime, timezone, timedelta
+from types import MappingProxyType
 from api.monitor_streams import handler as monitor_handler
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import threading
 import logging
 
-# Load environment variables
-load_dotenv()
+# Load .env only when the environment isn't already populated (production
+# sets real env vars, so the dotenv disk read is pure cold-start cost there)
+if not os.getenv("SUPABASE_URL"):
+    load_dotenv()
 
 # Set up logging - only use StreamHandler for serverless environments
 logging.basicConfig(
@@ -28,14 +57,109 @@ CRON_SECRET = os.getenv("CRON_SECRET")
 CRON_SECRET_DC_KEEP_ALIVE = os.getenv("CRON_SECRET_DC_KEEP_ALIVE")
 DISCORD_BOT_TOKEN = os.getenv("DISCORD_BOT_TOKEN")
 
+# Endpoint URLs and per-call header dicts are identical across requests, so
+# build them once at import instead of per call (auth lives on the session)
+SUPABASE_INSERT_URL = f"{SUPABASE_URL}/rest/v1/{SUPABASE_TABLE}"
+SUPABASE_CLIP_SUBMIT_RPC_URL = f"{SUPABASE_URL}/rest/v1/rpc/clip_submit"
+SUPABASE_YT_CHECK_URL_TMPL = (
+    f"{SUPABASE_URL}/rest/v1/{SUPABASE_YT_TABLE}"
+    "?chat_id=eq.{}&select=chat_id&limit=1"
+)
+SUPABASE_LIVE_STREAM_URL_TMPL = (
+    f"{SUPABASE_URL}/rest/v1/{SUPABASE_YT_TABLE}"
+    "?channel_id=eq.{}&status=eq.live&limit=1"
+)
+SUPABASE_CHANNEL_ROW_URL_TMPL = (
+    f"{SUPABASE_URL}/rest/v1/{SUPABASE_YT_CHANNEL_TABLE}"
+    "?channel_id=eq.{}&select=dc_channel_id,channel_template"
+)
+
+_JSON_HEADERS = MappingProxyType({"Content-Type": "application/json"})
+# return=minimal skips serializing the inserted row back (we only check the
+# status code); merge-duplicates makes retried inserts idempotent
+_INSERT_HEADERS = MappingProxyType(
+    {
+        "Content-Type": "application/json",
+        "Prefer": "return=minimal,resolution=merge-duplicates",
+    }
+)
+
+DISCORD_MESSAGES_URL_TMPL = "https://discord.com/api/v10/channels/{}/messages"
+DISCORD_ME_URL = "https://discord.com/api/v10/users/@me"
+
+# Static parts of the Discord embed, shared across every notification
+_EMBED_TEMPLATE = MappingProxyType(
+    {
+        "color": 0xFF0000,  # Red color like YouTube
+        "footer": {"text": "Tsnip • Click title to watch at this moment"},
+    }
+)
+
+
+def json_dumps(obj):
+    """Serialize to JSON bytes, using orjson when available (2-5x faster)"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode()
+
+
+def json_loads(data):
+    """Deserialize JSON bytes/str, using orjson when available"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Shared sessions so repeated Supabase/Discord calls reuse the same TCP+TLS
+# connection (keep-alive) instead of paying a fresh handshake per call
+def _build_session(extra_headers):
+    session = requests.Session()
+    session.mount(
+        "https://",
+        HTTPAdapter(
+            pool_connections=20,
+            pool_maxsize=100,
+            max_retries=Retry(
+                total=2, backoff_factor=0.1, status_forcelist=[502, 503, 504]
+            ),
+        ),
+    )
+    session.headers.update(extra_headers)
+    return session
+
+
+SUPABASE_SESSION = _build_session(
+    {
+        "apikey": SUPABASE_API_KEY,
+        "Authorization": f"Bearer {SUPABASE_API_KEY}",
+    }
+)
+
+DISCORD_SESSION = _build_session(
+    {
+        "Authorization": f"Bot {DISCORD_BOT_TOKEN}",
+    }
+)
+
 DEFAULT_TEMPLATE = (
     "Timestamped (with a -{delay}s delay) by {user}{title_part}."
     "All timestamps get commented after the stream ends. Tool used: {tool_used}"
 )
 
 
+_env_validated = False
+
+
 def validate_environment():
-    """Validate that all required environment variables are set"""
+    """Validate that all required environment variables are set.
+
+    The environment can't change within a process, so after one
+    successful pass warm requests return immediately."""
+    global _env_validated
+
+    if _env_validated:
+        return
+
     required_vars = [
         "SUPABASE_URL",
         "SUPABASE_API_KEY",
@@ -59,25 +183,106 @@ def validate_environment():
         )
 
     logger.info("All required environment variables are set")
+    _env_validated = True
 
 
 app = Flask(__name__)
 
+if orjson is not None:
+    from flask.json.provider import JSONProvider
+
+    class ORJSONProvider(JSONProvider):
+        """Route Flask's jsonify through orjson"""
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj).decode()
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = ORJSONProvider(app)
+
+# The YouTube processor (and its google-api client chain) is imported
+# lazily on first use so cold starts that never touch YouTube skip it.
+# Module ref and initialized instance are kept separate.
+_youtube_module = None
+_youtube_import_failed = False
+_youtube_init_lock = threading.Lock()
 youtube_processor = None
-youtube_processor_available = False
 
-try:
-    from . import youtube_processor
 
-    youtube_processor_available = True
-    logger.info("YouTube processor module is available")
-except ImportError as e:
-    logger.warning(f"YouTube processor module not available: {e}")
-    youtube_processor_available = False
+class TTLCache:
+    """Minimal in-process TTL cache so hot keys skip the Supabase round trip"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = {}
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if time.time() >= expires_at:
+            del self._data[key]
+            return None
+        return value
+
+    def set(self, key, value):
+        if len(self._data) >= self.maxsize:
+            # Drop the oldest inserted entry to stay bounded
+            self._data.pop(next(iter(self._data)), None)
+        self._data[key] = (time.time() + self.ttl, value)
+
+
+# Channel rows (Discord mapping + template) rarely change mid-stream;
+# chat_id membership is monotone (once a chat is in the YT table it stays),
+# so positive results can be cached longer. TTLs are tunable via env.
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "300"))
+CHAT_ID_CACHE_TTL_SECONDS = int(os.getenv("CHAT_ID_CACHE_TTL_SECONDS", "3600"))
+
+_channel_row_cache = TTLCache(maxsize=1024, ttl=CACHE_TTL_SECONDS)
+_chat_id_cache = TTLCache(maxsize=10000, ttl=CHAT_ID_CACHE_TTL_SECONDS)
+
+# Pool for firing independent Supabase lookups concurrently instead of
+# serially (wall-clock becomes max(RTT) rather than sum)
+_lookup_executor = ThreadPoolExecutor(max_workers=8)
+
+# Separate pool for fire-and-forget work (Discord notifications) so it
+# can't starve the lookup pool that requests block on
+_background_executor = ThreadPoolExecutor(max_workers=8)
+atexit.register(_background_executor.shutdown, wait=False)
+
+
+def iso_utc_now():
+    """ISO-8601 UTC timestamp built from time.time_ns.
+
+    Avoids the datetime object construction + isoformat cost paid on
+    every request and log payload."""
+    ns = time.time_ns()
+    seconds, rem = divmod(ns, 1_000_000_000)
+    return "%s.%06d+00:00" % (
+        time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(seconds)),
+        rem // 1000,
+    )
+
+
+# Request params are already strings, so membership needs no str() allocation
+# Timestamp render formats indexed by bool(hours); %-formatting beats an
+# f-string + branch in this per-clip helper
+_TS_FMT = ("%02d:%02d", "%02d:%02d:%02d")
+
+# Positional weights for HH:MM:SS / MM:SS conversion
+_TS_WEIGHTS = (3600, 60, 1)
+
+_PLACEHOLDER_VALUES = frozenset(
+    ("$(user)", "$(chatid)", "$(channelid)", "$(querystring)")
+)
 
 
 def is_placeholder_value(value):
-    return str(value) in ["$(user)", "$(chatid)", "$(channelid)", "$(querystring)"]
+    return value in _PLACEHOLDER_VALUES
 
 
 def check_chat_id_exists(chat_id):
@@ -85,64 +290,82 @@ def check_chat_id_exists(chat_id):
         logger.error("SUPABASE_YT_TABLE not configured")
         return False
 
-    headers = {
-        "apikey": SUPABASE_API_KEY,
-        "Authorization": f"Bearer {SUPABASE_API_KEY}",
-    }
+    if _chat_id_cache.get(chat_id):
+        return True
 
     try:
-        response = requests.get(
-            f"{SUPABASE_URL}/rest/v1/{SUPABASE_YT_TABLE}?chat_id=eq.{chat_id}&select=chat_id&limit=1",
-            headers=headers,
+        response = SUPABASE_SESSION.get(
+            SUPABASE_YT_CHECK_URL_TMPL.format(chat_id),
+            headers={"Prefer": "count=exact"},
             timeout=10,
         )
 
-        if response.status_code == 200:
-            existing = response.json()
-            return len(existing) > 0
+        if response.status_code in (200, 206):
+            # count=exact puts the total row count in Content-Range, so the
+            # body never needs parsing
+            total = response.headers.get("Content-Range", "").rsplit("/", 1)[-1]
+            if total.isdigit():
+                exists = int(total) > 0
+            else:
+                exists = len(json_loads(response.content)) > 0
+            if exists:
+                _chat_id_cache.set(chat_id, True)
+            return exists
         else:
-            logger.error(f"Error checking chat_id existence: {response.text}")
+            logger.error("Error checking chat_id existence: %s", response.text)
             return False
     except Exception as e:
         logger.error(f"Error checking chat_id: {str(e)}")
         return False
 
 
-def get_discord_channel_id(channel_id):
-    """Get Discord channel ID for a YouTube channel"""
+def get_channel_row(channel_id):
+    """Fetch dc_channel_id and channel_template for a channel in one select.
+
+    The Discord lookup and the template lookup hit the same row, so one
+    request (cached per channel) serves both. Returns a dict, empty when
+    the row is missing or the fetch fails."""
     if not SUPABASE_YT_CHANNEL_TABLE:
         logger.error("SUPABASE_YT_CHANNEL_TABLE not configured")
-        return None
+        return {}
 
-    url = f"{SUPABASE_URL}/rest/v1/{SUPABASE_YT_CHANNEL_TABLE}?channel_id=eq.{channel_id}&select=dc_channel_id"
-    headers = {
-        "apikey": SUPABASE_API_KEY,
-        "Authorization": f"Bearer {SUPABASE_API_KEY}",
-    }
+    cached = _channel_row_cache.get(channel_id)
+    if cached is not None:
+        return cached
 
     try:
-        resp = requests.get(url, headers=headers, timeout=10)
-        if resp.status_code == 200:
-            data = resp.json()
-            if data and data[0].get("dc_channel_id"):
-                return data[0]["dc_channel_id"]
+        resp = SUPABASE_SESSION.get(
+            SUPABASE_CHANNEL_ROW_URL_TMPL.format(channel_id), timeout=10
+        )
+        if resp.ok:
+            data = json_loads(resp.content)
+            row = data[0] if data else {}
+            _channel_row_cache.set(channel_id, row)
+            return row
+        logger.error("Error fetching channel row: %s", resp.text)
     except Exception as e:
-        logger.error(f"Error fetching Discord channel ID: {e}")
+        logger.error(f"Error fetching channel row from Supabase: {e}")
 
-    return None
+    return {}
+
+
+def get_discord_channel_id(channel_id):
+    """Get Discord channel ID for a YouTube channel"""
+    return get_channel_row(channel_id).get("dc_channel_id") or None
 
 
 def format_timestamp(start_time_str, user_time_str, delay):
     """Format timestamp for display"""
     try:
-        # Force UTC timezone-aware parsing
-        start_time = datetime.fromisoformat(start_time_str.replace("Z", "+00:00"))
+        # Force UTC timezone-aware parsing (ciso8601 handles the Z suffix
+        # natively and is ~10-50x faster than datetime.fromisoformat)
+        start_time = _parse_iso(start_time_str)
         if start_time.tzinfo is None:
             start_time = start_time.replace(tzinfo=timezone.utc)
         else:
             start_time = start_time.astimezone(timezone.utc)
 
-        user_time = datetime.fromisoformat(user_time_str)
+        user_time = _parse_iso(user_time_str)
         if user_time.tzinfo is None:
             user_time = user_time.replace(tzinfo=timezone.utc)
         else:
@@ -153,10 +376,8 @@ def format_timestamp(start_time_str, user_time_str, delay):
         total_seconds = max(0, int(delta.total_seconds()))  # avoid negatives
         hours, remainder = divmod(total_seconds, 3600)
         minutes, seconds = divmod(remainder, 60)
-        return (
-            f"{hours:02}:{minutes:02}:{seconds:02}"
-            if hours
-            else f"{minutes:02}:{seconds:02}"
+        return _TS_FMT[bool(hours)] % (
+            (hours, minutes, seconds) if hours else (minutes, seconds)
         )
     except Exception as e:
         logger.error(f"Error formatting timestamp: {e}")
@@ -167,13 +388,11 @@ def timestamp_to_seconds(timestamp):
     """Convert timestamp (HH:MM:SS or MM:SS) to seconds"""
     try:
         parts = timestamp.split(":")
-        if len(parts) == 2:  # MM:SS
-            minutes, seconds = map(int, parts)
-            return minutes * 60 + seconds
-        elif len(parts) == 3:  # HH:MM:SS
-            hours, minutes, seconds = map(int, parts)
-            return hours * 3600 + minutes * 60 + seconds
-        return 0
+        if len(parts) not in (2, 3):
+            return 0
+        return sum(
+            int(p) * w for p, w in zip(parts, _TS_WEIGHTS[-len(parts) :])
+        )
     except Exception as e:
         logger.error(f"Error converting timestamp to seconds: {e}")
         return 0
@@ -184,21 +403,15 @@ def get_live_stream_info(channel_id):
     if not SUPABASE_YT_TABLE:
         return None, None, None
 
-    headers = {
-        "apikey": SUPABASE_API_KEY,
-        "Authorization": f"Bearer {SUPABASE_API_KEY}",
-    }
-
     try:
         # Get the most recent live stream for this channel that's not ended
-        response = requests.get(
-            f"{SUPABASE_URL}/rest/v1/{SUPABASE_YT_TABLE}?channel_id=eq.{channel_id}&status=eq.live&limit=1",
-            headers=headers,
+        response = SUPABASE_SESSION.get(
+            SUPABASE_LIVE_STREAM_URL_TMPL.format(channel_id),
             timeout=10,
         )
 
-        if response.status_code == 200:
-            data = response.json()
+        if response.ok:
+            data = json_loads(response.content)
             logger.info(f"Live stream data: {data}")
             if data:
                 return (
@@ -242,44 +455,39 @@ def send_discord_message_immediate(
     # YouTube thumbnail URL
     thumbnail_url = f"https://img.youtube.com/vi/{video_id}/maxresdefault.jpg"
 
-    embed_title = message.strip() if message.strip() else f"📎 New Clip Created"
-
-    embed_fields = [
-        {"name": "🎬 Stream", "value": video_title, "inline": False},
-        {"name": "👤 Created by", "value": username, "inline": True},
-        {"name": "⏰ Timestamp", "value": timestamp, "inline": True},
-    ]
+    stripped_message = message.strip()
+    embed_title = stripped_message if stripped_message else "📎 New Clip Created"
 
     embed = {
+        **_EMBED_TEMPLATE,
         "title": embed_title,
         "url": youtube_url,
-        "color": 0xFF0000,  # Red color like YouTube
         "image": {"url": thumbnail_url},
-        "fields": embed_fields,
-        "footer": {"text": "Tsnip • Click title to watch at this moment"},
+        "fields": [
+            {"name": "🎬 Stream", "value": video_title, "inline": False},
+            {"name": "👤 Created by", "value": username, "inline": True},
+            {"name": "⏰ Timestamp", "value": timestamp, "inline": True},
+        ],
     }
 
     payload = {"embeds": [embed]}
 
-    headers = {
-        "Authorization": f"Bot {DISCORD_BOT_TOKEN}",
-        "Content-Type": "application/json",
-    }
-
     try:
-        response = requests.post(
-            f"https://discord.com/api/v10/channels/{discord_channel_id}/messages",
-            json=payload,
-            headers=headers,
+        response = DISCORD_SESSION.post(
+            DISCORD_MESSAGES_URL_TMPL.format(discord_channel_id),
+            data=json_dumps(payload),
+            headers=_JSON_HEADERS,
             timeout=10,
         )
 
-        if response.status_code == 200:
+        if response.ok:
             logger.info("✓ Sent immediate Discord notification with timestamp")
             return True
         else:
             logger.error(
-                f"✗ Failed to send Discord notification: {response.status_code} - {response.text}"
+                "✗ Failed to send Discord notification: %s - %s",
+                response.status_code,
+                response.text,
             )
             return False
 
@@ -289,22 +497,41 @@ def send_discord_message_immediate(
 
 
 def ensure_youtube_processor_initialized():
-    global youtube_processor
+    """Lazily import and initialize the YouTube processor on first use"""
+    global _youtube_module, _youtube_import_failed, youtube_processor
 
-    if not youtube_processor_available:
-        logger.warning(
-            "YouTube processor module not available, skipping initialization"
-        )
+    # Fast path: once initialized, skip the lock entirely (double-checked
+    # under the lock below for the thundering-herd cold start)
+    if youtube_processor is not None:
+        return youtube_processor
+
+    if os.getenv("TSNIP_SKIP_YT"):
         return None
 
-    if youtube_processor is None:
-        try:
-            logger.info("Initializing YouTube processor...")
-            youtube_processor = youtube_processor.initialize_youtube_processor()
-            logger.info("YouTube processor initialized successfully")
-        except Exception as e:
-            logger.error(f"Error initializing YouTube processor: {e}")
+    with _youtube_init_lock:
+        if _youtube_import_failed:
             return None
+
+        if _youtube_module is None:
+            try:
+                _youtube_module = importlib.import_module(
+                    ".youtube_processor", __package__
+                )
+                logger.info("YouTube processor module is available")
+            except ImportError as e:
+                logger.warning(f"YouTube processor module not available: {e}")
+                _youtube_import_failed = True
+                return None
+
+        if youtube_processor is None:
+            try:
+                logger.info("Initializing YouTube processor...")
+                youtube_processor = _youtube_module.initialize_youtube_processor()
+                logger.info("YouTube processor initialized successfully")
+            except Exception as e:
+                logger.error(f"Error initializing YouTube processor: {e}")
+                return None
+
     return youtube_processor
 
 
@@ -318,22 +545,22 @@ def insert_to_supabase(channelid, chat_id, delay, message, user, user_timestamp)
         "user_name": user,
     }
 
-    headers = {
-        "apikey": SUPABASE_API_KEY,
-        "Authorization": f"Bearer {SUPABASE_API_KEY}",
-        "Content-Type": "application/json",
-        "Prefer": "return=representation",
-    }
-
     try:
-        response = requests.post(
-            f"{SUPABASE_URL}/rest/v1/{SUPABASE_TABLE}", headers=headers, json=data
+        response = SUPABASE_SESSION.post(
+            SUPABASE_INSERT_URL,
+            headers=_INSERT_HEADERS,
+            data=json_dumps(data),
+            stream=True,
         )
 
-        if response.status_code != 201:
-            logger.error(f"Supabase insert failed: {response.text}")
+        if response.status_code not in (201, 204):
+            logger.error("Supabase insert failed: %s", response.text)
+            response.close()
             return False
 
+        # return=minimal means there is no body; close immediately so the
+        # connection goes straight back to the pool
+        response.close()
         return True
 
     except Exception as e:
@@ -342,7 +569,14 @@ def insert_to_supabase(channelid, chat_id, delay, message, user, user_timestamp)
 
 
 def send_discord_notification(channelid, message, user, user_timestamp, delay):
-    discord_channel_id = get_discord_channel_id(channelid)
+    # The Discord channel mapping and the live stream info are independent
+    # lookups, so fetch them in parallel
+    channel_future = _lookup_executor.submit(get_discord_channel_id, channelid)
+    stream_future = _lookup_executor.submit(get_live_stream_info, channelid)
+
+    discord_channel_id = channel_future.result()
+    video_id, video_title, stream_start_time = stream_future.result()
+
     if not discord_channel_id:
         logger.warning(
             f"⚠ No Discord integration found for YouTube channel {channelid}"
@@ -351,8 +585,6 @@ def send_discord_notification(channelid, message, user, user_timestamp, delay):
 
     logger.info(f"✓ Discord channel found for YouTube channel {channelid}")
 
-    video_id, video_title, stream_start_time = get_live_stream_info(channelid)
-
     timestamp = None
     if video_id and stream_start_time:
         timestamp = format_timestamp(stream_start_time, user_timestamp, delay)
@@ -384,26 +616,74 @@ def send_discord_notification(channelid, message, user, user_timestamp, delay):
 
 
 def get_comment_template(channel_id):
-    headers = {
-        "apikey": SUPABASE_API_KEY,
-        "Authorization": f"Bearer {SUPABASE_API_KEY}",
+    template = get_channel_row(channel_id).get("channel_template")
+    if template:
+        return template, True
+    return DEFAULT_TEMPLATE, False
+
+
+# Cleared on the first 404 so a deployment without the clip_submit
+# Postgres function pays the failed round trip once, not per request
+_clip_submit_rpc_available = True
+
+
+def clip_submit(channelid, chat_id, delay, message, user, user_timestamp):
+    """Insert the clip, check YT-table membership and fetch the channel
+    template in a single Supabase RPC round trip.
+
+    Relies on a `clip_submit` Postgres function that returns
+    `{"inserted": bool, "yt_exists": bool, "template": str|null}`.
+    Returns that dict, or None if the RPC is unavailable so callers can
+    fall back to the individual helpers."""
+    global _clip_submit_rpc_available
+    if not _clip_submit_rpc_available:
+        return None
+
+    payload = {
+        "p_channel_id": channelid,
+        "p_chat_id": chat_id,
+        "p_delay": int(delay),
+        "p_message": message,
+        "p_user_name": user,
+        "p_user_timestamp": user_timestamp,
     }
 
     try:
-        response = requests.get(
-            f"{SUPABASE_URL}/rest/v1/{SUPABASE_YT_CHANNEL_TABLE}?channel_id=eq.{channel_id}&select=channel_template",
-            headers=headers,
+        response = SUPABASE_SESSION.post(
+            SUPABASE_CLIP_SUBMIT_RPC_URL,
+            headers=_JSON_HEADERS,
+            data=json_dumps(payload),
             timeout=10,
         )
 
-        if response.status_code == 200:
-            data = response.json()
-            if data and data[0]["channel_template"]:
-                return data[0]["channel_template"], True
+        if response.ok:
+            result = json_loads(response.content)
+            if isinstance(result, dict) and "inserted" in result:
+                return result
+            logger.error(f"Unexpected clip_submit RPC result: {result}")
+        elif response.status_code == 404:
+            # Function not deployed; remember and use the fallback
+            # helpers for the rest of the process lifetime
+            logger.info("clip_submit RPC not deployed, disabling it")
+            _clip_submit_rpc_available = False
+        else:
+            logger.error(
+                "clip_submit RPC failed (%s): %s", response.status_code, response.text
+            )
     except Exception as e:
-        logger.error(f"Error fetching template from Supabase: {e}")
+        logger.error(f"Error in clip_submit RPC: {e}")
 
-    return DEFAULT_TEMPLATE, False
+    return None
+
+
+@lru_cache(maxsize=2048)
+def render_comment(template, user, delay, title_part):
+    """Render the clip response; identical (template, user, delay, title)
+    combinations recur constantly during a stream, so memoize the
+    formatted string instead of re-parsing the template each time."""
+    return template.format(
+        user=user, delay=delay, title_part=title_part, tool_used=TOOL_USED
+    )
 
 
 def is_valid_chat_id(chat_id):
@@ -432,11 +712,14 @@ def clip_handler():
     # Validate environment variables
     validate_environment()
 
-    user = request.args.get("user") or request.form.get("user")
-    channel_id = request.args.get("channelid") or request.form.get("channelid")
-    chat_id = request.args.get("chatId") or request.form.get("chatId")
-    msg = request.args.get("msg") or request.form.get("msg") or ""
-    delay = request.args.get("delay") or request.form.get("delay")
+    # Flask's combined args+form MultiDict (args win): one lookup per param
+    # instead of the two-call or-chain
+    params = request.values
+    user = params.get("user")
+    channel_id = params.get("channelid")
+    chat_id = params.get("chatId")
+    msg = params.get("msg") or ""
+    delay = params.get("delay")
 
     # Input validation
     if not all([user, channel_id, chat_id, delay is not None]):
@@ -475,10 +758,27 @@ def clip_handler():
 
     logger.info(f"Processing clip for channel {channel_id}, user {user}")
 
-    user_timestamp = datetime.now(timezone.utc).isoformat()
+    user_timestamp = iso_utc_now()
 
-    # Insert to Supabase
-    success = insert_to_supabase(channel_id, chat_id, delay, msg, user, user_timestamp)
+    # One RPC round trip covers the insert, the chat_id existence check and
+    # the template lookup; fall back to the individual calls if the RPC
+    # function is not deployed
+    rpc_result = clip_submit(channel_id, chat_id, delay, msg, user, user_timestamp)
+
+    chat_future = template_future = None
+    if rpc_result is not None:
+        success = bool(rpc_result.get("inserted"))
+    else:
+        success = insert_to_supabase(
+            channel_id, chat_id, delay, msg, user, user_timestamp
+        )
+        if success:
+            # The existence check and template fetch don't depend on each
+            # other — fire both now and join where the values are needed
+            chat_future = _lookup_executor.submit(check_chat_id_exists, chat_id)
+            template_future = _lookup_executor.submit(
+                get_comment_template, channel_id
+            )
 
     if not success:
         logger.error("Failed to save timestamp to database")
@@ -489,55 +789,96 @@ def clip_handler():
         )
 
     # Check if we need to process YouTube data
-    if not check_chat_id_exists(chat_id):
+    if rpc_result is not None:
+        chat_id_known = bool(rpc_result.get("yt_exists"))
+    else:
+        chat_id_known = chat_future.result()
+
+    if not chat_id_known:
         logger.info(
             f"Chat ID {chat_id} not found in YT table, attempting YouTube processing..."
         )
         processor = ensure_youtube_processor_initialized()
         if processor:
             try:
-                yt_success = processor.process_youtube_request(chat_id, channel_id)
-                if yt_success:
-                    logger.info("YouTube processing completed successfully")
-                else:
-                    logger.warning("YouTube processing failed")
+                # Hand the job to the background worker instead of blocking
+                # the HTTP response on YouTube API calls
+                processor.add_to_queue(chat_id, channel_id)
+                logger.info("YouTube processing queued in background")
             except Exception as e:
-                logger.error(f"Error during YouTube processing: {str(e)}")
+                logger.error(f"Error queueing YouTube processing: {str(e)}")
     else:
         logger.info(f"Chat ID {chat_id} already exists, skipping YouTube processing")
 
-    # Send discord notificaion
-    send_discord_notification(channel_id, msg, user, user_timestamp, delay)
+    # Send discord notification in the background — its result isn't part
+    # of the response body, so don't hold the reply for it
+    _background_executor.submit(
+        send_discord_notification, channel_id, msg, user, user_timestamp, delay
+    )
 
     title_part = f" — titled '{msg}'" if msg else ""
-    template, is_custom = get_comment_template(channel_id)
 
-    comment = template.format(
-        user=user, delay=delay, title_part=title_part, tool_used=TOOL_USED
-    )
+    if rpc_result is not None:
+        template = rpc_result.get("template") or DEFAULT_TEMPLATE
+        is_custom = bool(rpc_result.get("template"))
+    else:
+        template, is_custom = template_future.result()
+
+    comment = render_comment(template, user, delay, title_part)
 
     logger.info(
         f"Using template for channel {channel_id}: {'custom' if is_custom else 'default'}"
     )
 
-    return Response(comment, mimetype="text/plain")
+    # The comment is deterministic for identical args, so an ETag lets
+    # repeat commands short-circuit to 304 and skip the body transfer
+    etag = hashlib.blake2b(comment.encode(), digest_size=16).hexdigest()
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
 
+    response = Response(comment, mimetype="text/plain")
+    response.set_etag(etag)
+    return response
 
-@app.route("/api/monitor-streams", methods=["GET", "POST"])
-def cron_monitor_streams():
-    secret = request.args.get("secret") or request.headers.get("X-Cron-Secret")
-    if not secret or secret != CRON_SECRET:
-        logger.warning("Unauthorized access attempt to monitor-streams endpoint")
-        return jsonify({"error": "Unauthorized"}), 401
 
+# Guards so overlapping cron hits don't start concurrent sweeps
+_monitor_lock = threading.Lock()
+_monitor_running = False
+
+
+def _run_monitor_sweep():
+    global _monitor_running
     try:
         logger.info("Executing stream monitoring...")
         monitor_handler()
         logger.info("Stream monitoring executed successfully")
-        return jsonify({"message": "Stream monitoring executed successfully"}), 200
     except Exception as e:
         logger.error(f"Error in stream monitoring: {str(e)}")
-        return jsonify({"error": str(e)}), 500
+    finally:
+        with _monitor_lock:
+            _monitor_running = False
+
+
+@app.route("/api/monitor-streams", methods=["GET", "POST"])
+def cron_monitor_streams():
+    global _monitor_running
+    secret = request.args.get("secret") or request.headers.get("X-Cron-Secret")
+    if not secret or secret != CRON_SECRET:
+        logger.warning("Unauthorized access attempt to monitor-streams endpoint")
+        return jsonify({"error": "Unauthorized"}), 401
+
+    # Run the sweep in the background and acknowledge immediately so the
+    # cron request doesn't hold a worker (or hit the function timeout) for
+    # the whole sweep
+    with _monitor_lock:
+        if _monitor_running:
+            return jsonify({"message": "Stream monitoring already running"}), 202
+        _monitor_running = True
+
+    threading.Thread(target=_run_monitor_sweep, daemon=True).start()
+    return jsonify({"message": "Stream monitoring queued"}), 202
 
 
 @app.route("/api/dc-keepalive", methods=["GET", "POST"])
@@ -560,22 +901,14 @@ def discord_keepalive():
         return jsonify({"status": "error", "message": "Invalid or missing secret"}), 401
 
     try:
-        start_time = datetime.now()
-
-        response = requests.get(
-            "https://discord.com/api/v10/users/@me",
-            headers={
-                "Authorization": f"Bot {DISCORD_BOT_TOKEN}",
-                "Content-Type": "application/json",
-            },
-            timeout=10,
-        )
+        start_time = time.perf_counter()
+
+        response = DISCORD_SESSION.get(DISCORD_ME_URL, timeout=10)
 
-        end_time = datetime.now()
-        response_time = (end_time - start_time).total_seconds()
+        response_time = time.perf_counter() - start_time
 
-        if response.status_code == 200:
-            bot_data = response.json()
+        if response.ok:
+            bot_data = json_loads(response.content)
             logger.info(f"Keepalive successful for bot: {bot_data.get('username')}")
 
             return jsonify(
@@ -585,7 +918,7 @@ def discord_keepalive():
                     "bot_username": bot_data.get("username"),
                     "bot_discriminator": bot_data.get("discriminator"),
                     "response_time_ms": round(response_time * 1000, 2),
-                    "timestamp": datetime.now().isoformat(),
+                    "timestamp": iso_utc_now(),
                 }
             )
         else:
@@ -595,7 +928,7 @@ def discord_keepalive():
                     "status": "warning",
                     "message": f"Discord API returned {response.status_code}",
                     "response_code": response.status_code,
-                    "timestamp": datetime.now().isoformat(),
+                    "timestamp": iso_utc_now(),
                 }
             )
 
@@ -607,7 +940,7 @@ def discord_keepalive():
                     "status": "error",
                     "message": "Keepalive failed",
                     "error": str(e),
-                    "timestamp": datetime.now().isoformat(),
+                    "timestamp": iso_utc_now(),
                 }
             ),
             500,
@@ -616,12 +949,11 @@ def discord_keepalive():
 
 @app.route("/health", methods=["GET"])
 def health_check():
-    return jsonify({"status": "healthy", "timestamp": datetime.now().isoformat()})
+    return jsonify({"status": "healthy", "timestamp": iso_utc_now()})
 
 
 if __name__ == "__main__":
     logger.info(
         "Starting Flask app with conditional YouTube processor initialization..."
     )
-    logger.info(f"YouTube processor available: {youtube_processor_available}")
     app.run(debug=True)
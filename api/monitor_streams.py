@@ -1,12 +1,20 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
 import time
+import random
 import re
 import logging
+import threading
+from functools import lru_cache
+from collections import deque
 from dotenv import load_dotenv
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from google.auth.transport.requests import Request
 
 # Configure logging
@@ -17,8 +25,45 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+# orjson decodes large Supabase/YouTube payloads 2-3x faster than the
+# stdlib; fall back silently when it is not installed
+try:
+    import orjson
+
+    def json_loads(data):
+        return orjson.loads(data)
+
+    def json_dumps(obj):
+        return orjson.dumps(obj)
+
+except ImportError:
+    import json as _stdlib_json
+
+    def json_loads(data):
+        return _stdlib_json.loads(data)
+
+    def json_dumps(obj):
+        return _stdlib_json.dumps(obj).encode("utf-8")
+
+
+# ciso8601 parses ISO-8601 (including the Z suffix) in C, far faster
+# than fromisoformat plus the per-call .replace allocation
+try:
+    import ciso8601
+
+    def _parse_iso(value):
+        return ciso8601.parse_datetime(value)
+
+except ImportError:
+
+    def _parse_iso(value):
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+# Load environment variables; skip the .env file parse on cold start
+# when the platform already injected the config
+if "SUPABASE_URL" not in os.environ:
+    load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_API_KEY = os.getenv("SUPABASE_API_KEY")
@@ -32,6 +77,42 @@ YOUTUBE_REFRESH_TOKEN = os.getenv("YOUTUBE_REFRESH_TOKEN")
 # YouTube comment character limit (conservative estimate)
 YOUTUBE_COMMENT_MAX_LENGTH = 9000
 
+_COMMENT_HEADER = "Time stamps:\n\n"
+_COMMENT_FOOTER = "\n\nThank you for using Tsnip."
+_TRUNCATION_NOTICE = "\n\n[Comment truncated due to length limit]"
+
+# Compiled once; remove_custom_emojis runs per chat message
+_EMOJI_RE = re.compile(r":_[^:]+:")
+
+# Badge style constant YouTube embeds in ytInitialData for
+# members-only videos; scanned as raw bytes, never parsed
+_MEMBERS_BADGE_SENTINEL = b"BADGE_STYLE_TYPE_MEMBERS_ONLY"
+
+# Concurrency for the per-video sweep; the work is I/O-bound so a small
+# bounded pool collapses wall time without hammering the APIs
+MONITOR_MAX_WORKERS = int(os.getenv("MONITOR_MAX_WORKERS", "4"))
+
+# Shared keep-alive sessions: the sweep hits just two hosts (Supabase and
+# Google) N times each, so pooling saves a TCP+TLS handshake per call.
+# Supabase auth stays on its own session so the key never leaves Supabase.
+_RETRY = Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+
+SUPABASE_SESSION = requests.Session()
+SUPABASE_SESSION.mount(
+    "https://", HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=_RETRY)
+)
+SUPABASE_SESSION.headers.update(
+    {
+        "apikey": SUPABASE_API_KEY,
+        "Authorization": f"Bearer {SUPABASE_API_KEY}",
+    }
+)
+
+HTTP_SESSION = requests.Session()
+HTTP_SESSION.mount(
+    "https://", HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=_RETRY)
+)
+
 
 def validate_environment():
     """Validate that all required environment variables are set"""
@@ -59,10 +140,31 @@ def validate_environment():
     logger.info("All required environment variables are set")
 
 
+# Credentials and discovery client are reused across the whole run; the
+# OAuth refresh (a network round trip) only happens when the token expires.
+# The lock keeps concurrent workers from racing the refresh.
+_yt_creds = None
+_yt_client = None
+_yt_lock = threading.Lock()
+
+
 def get_youtube_client():
     """Get authenticated YouTube client with error handling"""
+    global _yt_creds, _yt_client
+
     try:
-        creds = Credentials(
+        with _yt_lock:
+            return _get_youtube_client_locked()
+    except Exception as e:
+        logger.error(f"Failed to authenticate YouTube client: {e}")
+        raise
+
+
+def _get_youtube_client_locked():
+    global _yt_creds, _yt_client
+
+    if _yt_creds is None:
+        _yt_creds = Credentials(
             None,
             refresh_token=YOUTUBE_REFRESH_TOKEN,
             token_uri="https://oauth2.googleapis.com/token",
@@ -70,29 +172,46 @@ def get_youtube_client():
             client_secret=YOUTUBE_CLIENT_SECRET,
             scopes=["https://www.googleapis.com/auth/youtube.force-ssl"],
         )
-        creds.refresh(Request())
-        client = build("youtube", "v3", credentials=creds, cache_discovery=False)
+
+    if not _yt_creds.valid or _yt_creds.expired:
+        _yt_creds.refresh(Request())
         logger.info("YouTube client authenticated successfully")
-        return client
-    except Exception as e:
-        logger.error(f"Failed to authenticate YouTube client: {e}")
-        raise
+
+    if _yt_client is None:
+        _yt_client = build(
+            "youtube", "v3", credentials=_yt_creds, cache_discovery=False
+        )
+
+    return _yt_client
 
 
 def get_unmarked_streams():
-    """Get unmarked streams from Supabase with error handling"""
+    """Get unmarked streams from Supabase with error handling.
+
+    Pages through the table in 1000-row ranges (Supabase's implicit cap
+    per response) so a large backlog is neither truncated nor
+    materialized server-side in one oversized payload."""
     try:
         url = f"{SUPABASE_URL}/rest/v1/{SUPABASE_YT_TABLE}?marked=eq.false&select=video_id,id,chat_id,channel_id,stream_start_time"
-        headers = {
-            "apikey": SUPABASE_API_KEY,
-            "Authorization": f"Bearer {SUPABASE_API_KEY}",
-        }
 
         logger.info("Fetching unmarked streams from Supabase")
-        resp = requests.get(url, headers=headers, timeout=30)
-        resp.raise_for_status()
+        data = []
+        page_size = 1000
+        start = 0
+        while True:
+            resp = SUPABASE_SESSION.get(
+                url,
+                headers={"Range": f"{start}-{start + page_size - 1}"},
+                timeout=30,
+            )
+            resp.raise_for_status()
+
+            rows = json_loads(resp.content)
+            data.extend(rows)
+            if len(rows) < page_size:
+                break
+            start += page_size
 
-        data = resp.json()
         logger.info(f"Retrieved {len(data)} unmarked streams")
         return data
 
@@ -107,17 +226,28 @@ def get_unmarked_streams():
 def get_chat_messages(chat_id):
     """Get chat messages from Supabase with error handling"""
     try:
-        url = f"{SUPABASE_URL}/rest/v1/{SUPABASE_TABLE}?chat_id=eq.{chat_id}&select=message,user_name,user_timestamp,delay"
-        headers = {
-            "apikey": SUPABASE_API_KEY,
-            "Authorization": f"Bearer {SUPABASE_API_KEY}",
-        }
+        url = (
+            f"{SUPABASE_URL}/rest/v1/{SUPABASE_TABLE}?chat_id=eq.{chat_id}"
+            "&select=message,user_name,user_timestamp,delay"
+            "&order=user_timestamp.asc"
+        )
 
         logger.info(f"Fetching chat messages for chat_id: {chat_id}")
-        resp = requests.get(url, headers=headers, timeout=30)
+        # Explicit range + exact count: Supabase caps unranged selects at
+        # 1000 rows, which would silently truncate long streams
+        resp = SUPABASE_SESSION.get(
+            url,
+            headers={"Range": "0-9999", "Prefer": "count=exact"},
+            timeout=30,
+        )
         resp.raise_for_status()
 
-        data = resp.json()
+        data = json_loads(resp.content)
+        total = resp.headers.get("Content-Range", "").rsplit("/", 1)[-1]
+        if total.isdigit() and int(total) > len(data):
+            logger.warning(
+                f"Chat {chat_id} has {total} messages; only {len(data)} fetched"
+            )
         logger.info(f"Retrieved {len(data)} chat messages for chat_id: {chat_id}")
         return data
 
@@ -131,104 +261,206 @@ def get_chat_messages(chat_id):
         return []
 
 
-def format_timestamp(start_time_str, user_time_str, delay):
-    """Format timestamp for display"""
+def get_chat_messages_bulk(chat_ids):
+    """Fetch chat messages for many chats in one Supabase query.
+
+    PostgREST's in.(...) filter collapses one round trip per chat into one
+    request per 100-chat chunk. Returns a dict of chat_id -> message list;
+    chats from a failed chunk are omitted so callers can fall back to the
+    per-chat fetch."""
+    grouped = {chat_id: [] for chat_id in chat_ids}
+    unique_ids = list(grouped)
+
+    for i in range(0, len(unique_ids), 100):
+        chunk = unique_ids[i : i + 100]
+        url = (
+            f"{SUPABASE_URL}/rest/v1/{SUPABASE_TABLE}"
+            f"?chat_id=in.({','.join(chunk)})"
+            "&select=chat_id,message,user_name,user_timestamp,delay"
+            "&order=chat_id.asc,user_timestamp.asc"
+        )
+
+        try:
+            logger.info(f"Fetching chat messages for {len(chunk)} chats")
+            resp = SUPABASE_SESSION.get(
+                url,
+                headers={"Range": "0-9999", "Prefer": "count=exact"},
+                timeout=30,
+            )
+            resp.raise_for_status()
+
+            rows = json_loads(resp.content)
+            for m in rows:
+                grouped[m["chat_id"]].append(m)
+
+            # A capped response cuts mid-chat: rows are chat_id-ordered,
+            # so the last chat seen holds a partial list. Drop it so the
+            # per-chat fallback (which detects its own truncation)
+            # refetches it; chats entirely after the cut stay empty and
+            # are simply retried next sweep.
+            total = resp.headers.get("Content-Range", "").rsplit("/", 1)[-1]
+            if rows and total.isdigit() and int(total) > len(rows):
+                boundary_chat = rows[-1]["chat_id"]
+                logger.warning(
+                    f"Bulk message fetch truncated ({len(rows)} of {total} rows); "
+                    f"deferring chat {boundary_chat} to the per-chat fetch"
+                )
+                grouped.pop(boundary_chat, None)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request error while fetching chat messages batch: {e}")
+            for chat_id in chunk:
+                grouped.pop(chat_id, None)
+        except Exception as e:
+            logger.error(f"Unexpected error while fetching chat messages batch: {e}")
+            for chat_id in chunk:
+                grouped.pop(chat_id, None)
+
+    return grouped
+
+
+def fetch_unmarked_with_messages():
+    """Fetch unmarked streams joined with their chat messages in one call.
+
+    Uses an unmarked_with_messages() RPC (a SQL function joining the
+    streams table with the messages table, returning one row per message
+    with the stream columns repeated). Collapses the 1 + N Supabase
+    round trips of get_unmarked_streams + per-chat fetches into one.
+    Paged in 1000-row ranges like get_unmarked_streams — the implicit
+    cap applies to set-returning RPCs too, and one row per message
+    overruns it easily. Returns (streams, messages_map) or None when
+    the RPC is unavailable so the caller can fall back to the separate
+    queries."""
     try:
-        # Force UTC timezone-aware parsing
-        start_time = datetime.fromisoformat(start_time_str.replace("Z", "+00:00"))
-        if start_time.tzinfo is None:
-            start_time = start_time.replace(tzinfo=timezone.utc)
-        else:
-            start_time = start_time.astimezone(timezone.utc)
+        rows = []
+        page_size = 1000
+        start = 0
+        while True:
+            resp = SUPABASE_SESSION.post(
+                f"{SUPABASE_URL}/rest/v1/rpc/unmarked_with_messages",
+                headers={
+                    "Content-Type": "application/json",
+                    "Range": f"{start}-{start + page_size - 1}",
+                },
+                data=json_dumps({}),
+                timeout=30,
+            )
+            if resp.status_code == 404:
+                logger.info("unmarked_with_messages RPC not deployed; falling back")
+                return None
+            resp.raise_for_status()
+
+            page = json_loads(resp.content)
+            rows.extend(page)
+            if len(page) < page_size:
+                break
+            start += page_size
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Request error calling unmarked_with_messages RPC: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Unexpected error calling unmarked_with_messages RPC: {e}")
+        return None
+
+    streams = {}
+    messages_map = {}
+    for r in rows:
+        video_id = r["video_id"]
+        if video_id not in streams:
+            streams[video_id] = {
+                "video_id": video_id,
+                "id": r["id"],
+                "chat_id": r["chat_id"],
+                "channel_id": r.get("channel_id"),
+                "stream_start_time": r.get("stream_start_time"),
+            }
+        # Streams with no messages come back with NULL message columns
+        if r.get("user_timestamp"):
+            messages_map.setdefault(r["chat_id"], []).append(
+                {
+                    "chat_id": r["chat_id"],
+                    "message": r.get("message"),
+                    "user_name": r.get("user_name"),
+                    "user_timestamp": r["user_timestamp"],
+                    "delay": r.get("delay", 0),
+                }
+            )
 
-        user_time = datetime.fromisoformat(user_time_str)
-        if user_time.tzinfo is None:
-            user_time = user_time.replace(tzinfo=timezone.utc)
-        else:
-            user_time = user_time.astimezone(timezone.utc)
+    logger.info(f"Retrieved {len(streams)} unmarked streams via joined RPC")
+    return list(streams.values()), messages_map
 
-        adjusted_user_time = user_time - timedelta(seconds=delay)
-        delta = adjusted_user_time - start_time
-        total_seconds = max(0, int(delta.total_seconds()))  # avoid negatives
+
+def _parse_utc(value):
+    """Parse an ISO-8601 string into a timezone-aware UTC datetime"""
+    dt = _parse_iso(value)
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+@lru_cache(maxsize=4096)
+def format_timestamp(start_ts, user_time_str, delay):
+    """Format timestamp for display.
+
+    start_ts is the stream start as epoch seconds (computed once per
+    stream); per message this costs one parse and float arithmetic, with
+    no timedelta objects. Memoized: clips submitted within the same
+    second repeat identical (timestamp, delay) pairs."""
+    try:
+        offset = _parse_utc(user_time_str).timestamp() - start_ts - delay
+        total_seconds = max(0, int(offset))  # avoid negatives
         hours, remainder = divmod(total_seconds, 3600)
         minutes, seconds = divmod(remainder, 60)
+        # %-formatting with fixed int specs takes a C-level fast path,
+        # which adds up over thousand-message chats
         return (
-            f"{hours:02}:{minutes:02}:{seconds:02}"
+            "%02d:%02d:%02d" % (hours, minutes, seconds)
             if hours
-            else f"{minutes:02}:{seconds:02}"
+            else "%02d:%02d" % (minutes, seconds)
         )
     except Exception as e:
         logger.error(f"Error formatting timestamp: {e}")
         return "00:00"
 
 def check_member_only_from_page(video_id):
-    """Check if video is member-only by scraping YouTube page for badges"""
+    """Check if video is member-only by scanning the watch page for the
+    members badge.
+
+    The badge style constant is distinctive enough that a raw byte scan
+    answers the question without parsing the multi-megabyte
+    ytInitialData blob into Python objects."""
     try:
-        import re
-        import json
-        
         url = f"https://www.youtube.com/watch?v={video_id}"
         headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
-        
-        resp = requests.get(url, headers=headers, timeout=30)
+
+        resp = HTTP_SESSION.get(url, headers=headers, timeout=30, stream=True)
         resp.raise_for_status()
-        
-        # Extract JSON data from HTML
-        # YouTube embeds initial data in a script tag
-        pattern = r'var ytInitialData = ({.*?});'
-        match = re.search(pattern, resp.text)
-        
-        if not match:
-            logger.warning(f"Could not find ytInitialData in page for video {video_id}")
-            return False
-            
+
+        # Stream in chunks and stop at the first sentinel hit; keep a
+        # small carry so a sentinel split across chunks still matches
+        found = False
+        carry = b""
+        total = 0
         try:
-            initial_data = json.loads(match.group(1))
-            
-            # Navigate to the video primary info renderer
-            try:
-                contents = initial_data["contents"]["twoColumnWatchNextResults"]["results"]["results"]["contents"]
-                
-                # Find the videoPrimaryInfoRenderer (usually first item)
-                video_primary_info = None
-                for item in contents:
-                    if "videoPrimaryInfoRenderer" in item:
-                        video_primary_info = item["videoPrimaryInfoRenderer"]
-                        break
-                
-                if video_primary_info and "badges" in video_primary_info:
-                    # Check if any badge indicates member-only content
-                    badges = video_primary_info["badges"]
-                    for badge in badges:
-                        if "metadataBadgeRenderer" in badge:
-                            badge_renderer = badge["metadataBadgeRenderer"]
-                            # Check badge text or style for member indicators
-                            if "label" in badge_renderer:
-                                label = badge_renderer["label"].lower()
-                                if "member" in label:
-                                    logger.info(f"Video {video_id} detected as member-only via badge: {label}")
-                                    return True
-                            
-                            # Check badge style/icon for member indicators
-                            if "style" in badge_renderer:
-                                style = badge_renderer["style"]
-                                if "BADGE_STYLE_TYPE_MEMBERS_ONLY" in style:
-                                    logger.info(f"Video {video_id} detected as member-only via badge style")
-                                    return True
-                
-                logger.info(f"Video {video_id} - No member-only badges found")
-                return False
-                
-            except (KeyError, TypeError) as e:
-                logger.warning(f"Could not navigate JSON structure for video {video_id}: {e}")
-                return False
-                
-        except json.JSONDecodeError as e:
-            logger.error(f"Could not parse JSON data for video {video_id}: {e}")
-            return False
-            
+            for chunk in resp.iter_content(chunk_size=65536):
+                total += len(chunk)
+                if _MEMBERS_BADGE_SENTINEL in carry + chunk:
+                    found = True
+                    break
+                carry = (carry + chunk)[-(len(_MEMBERS_BADGE_SENTINEL) - 1) :]
+                if total > 2_097_152:
+                    break
+        finally:
+            resp.close()
+
+        if found:
+            logger.info(f"Video {video_id} detected as member-only via badge style")
+            return True
+
+        logger.info(f"Video {video_id} - No member-only badges found")
+        return False
+
     except requests.exceptions.RequestException as e:
         logger.error(f"Request error checking member-only status for {video_id}: {e}")
         return False
@@ -236,17 +468,87 @@ def check_member_only_from_page(video_id):
         logger.error(f"Unexpected error checking member-only status for {video_id}: {e}")
         return False
 
-def is_video_ready_for_comments(video_id):
-    """Check if video is public and ready for comments, including live stream detection"""
+# Only the fields the readiness check actually reads; shrinks the
+# videos.list payload substantially
+_VIDEO_FIELDS = (
+    "items(id,status(privacyStatus,madeForKids),"
+    "snippet(liveBroadcastContent),"
+    "liveStreamingDetails(actualStartTime,actualEndTime))"
+)
+
+
+def fetch_video_data_bulk(video_ids):
+    """Fetch status/snippet/liveStreamingDetails for many videos at once.
+
+    videos.list accepts up to 50 comma-separated ids per call, so one
+    request (and one quota unit) covers a whole batch instead of one
+    probe per video. Returns a dict of video_id -> videos.list item."""
+    results = {}
+
+    for i in range(0, len(video_ids), 50):
+        chunk = video_ids[i : i + 50]
+        url = (
+            "https://www.googleapis.com/youtube/v3/videos"
+            f"?part=status,snippet,liveStreamingDetails"
+            f"&fields={_VIDEO_FIELDS}"
+            f"&id={','.join(chunk)}&key={YT_DATA_API_V3}"
+        )
+
+        try:
+            resp = HTTP_SESSION.get(url, timeout=30)
+            resp.raise_for_status()
+
+            for item in json_loads(resp.content).get("items", []):
+                results[item["id"]] = item
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request error fetching video data batch: {e}")
+        except Exception as e:
+            logger.error(f"Unexpected error fetching video data batch: {e}")
+
+    return results
+
+
+# Status answers barely change within a retry window, so cache them
+# briefly to avoid re-spending quota on back-to-back probes. Warm
+# processes (e.g. the monitor triggered through the Flask app) keep the
+# cache across invocations, so the TTL is tunable.
+_VIDEO_STATUS_TTL = int(os.getenv("VIDEO_STATUS_TTL_SECONDS", "60"))
+_video_status_cache = {}
+
+
+def is_video_ready_for_comments(video_id, video_data=None):
+    """Cached wrapper around _check_video_ready; probes within the last
+    _VIDEO_STATUS_TTL seconds are answered from memory. Member-only
+    answers never expire — that state does not flip back, and each miss
+    would cost a watch-page scrape."""
+    cached = _video_status_cache.get(video_id)
+    if cached is not None:
+        ts, status = cached
+        if status.get("is_member_only"):
+            return status
+        if video_data is None and time.time() - ts < _VIDEO_STATUS_TTL:
+            return status
+
+    status = _check_video_ready(video_id, video_data)
+    _video_status_cache[video_id] = (time.time(), status)
+    return status
+
+
+def _check_video_ready(video_id, video_data=None):
+    """Check if video is public and ready for comments, including live stream detection.
+
+    Accepts a prefetched videos.list item (from fetch_video_data_bulk) to
+    skip the per-video API call."""
     try:
-        url = f"https://www.googleapis.com/youtube/v3/videos?part=status,statistics,snippet,liveStreamingDetails&id={video_id}&key={YT_DATA_API_V3}"
-        resp = requests.get(url, timeout=30)
-        resp.raise_for_status()
+        if video_data is None:
+            url = f"https://www.googleapis.com/youtube/v3/videos?part=status,snippet,liveStreamingDetails&fields={_VIDEO_FIELDS}&id={video_id}&key={YT_DATA_API_V3}"
+            resp = HTTP_SESSION.get(url, timeout=30)
+            resp.raise_for_status()
 
-        data = resp.json()
-        items = data.get("items", [])
+            items = json_loads(resp.content).get("items", [])
+            video_data = items[0] if items else None
 
-        if not items:
+        if not video_data:
             logger.warning(f"No video data found for video_id: {video_id}")
             return {
                 "can_comment": False,
@@ -257,7 +559,6 @@ def is_video_ready_for_comments(video_id):
                 "is_live": False,
             }
 
-        video_data = items[0]
         status = video_data.get("status", {})
         snippet = video_data.get("snippet", {})
         live_streaming_details = video_data.get("liveStreamingDetails", {})
@@ -349,8 +650,42 @@ def is_video_ready_for_comments(video_id):
     }
 
 
-def post_comment_with_retry(video_id, comment_body, max_retries=3, delay=60):
-    """Post comment with retry logic and proper error handling"""
+class _TokenBucket:
+    """Thread-safe sliding-window limiter for YouTube comment writes.
+
+    With the videos processed in parallel, the insert calls need a
+    shared gate so a large backlog cannot burst past the write quota."""
+
+    def __init__(self, rate, per):
+        self.rate = rate
+        self.per = per
+        self._stamps = deque()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._stamps and now - self._stamps[0] > self.per:
+                    self._stamps.popleft()
+                if len(self._stamps) < self.rate:
+                    self._stamps.append(now)
+                    return
+                wait = self.per - (now - self._stamps[0])
+            time.sleep(max(wait, 0.05))
+
+
+_comment_bucket = _TokenBucket(
+    rate=int(os.getenv("COMMENT_WRITES_PER_MINUTE", "30")), per=60.0
+)
+
+
+def post_comment_with_retry(video_id, comment_body, video_status=None, max_retries=3, delay=60):
+    """Post comment with retry logic and proper error handling.
+
+    Accepts the caller's already-fetched status so the first attempt
+    spends no extra probe; later attempts re-poll (served from the TTL
+    cache when still fresh)."""
     for attempt in range(max_retries):
         try:
             logger.info(
@@ -358,7 +693,8 @@ def post_comment_with_retry(video_id, comment_body, max_retries=3, delay=60):
             )
 
             # Check if video is ready for comments
-            video_status = is_video_ready_for_comments(video_id)
+            if video_status is None:
+                video_status = is_video_ready_for_comments(video_id)
 
             if video_status["is_member_only"]:
                 logger.info(
@@ -368,12 +704,16 @@ def post_comment_with_retry(video_id, comment_body, max_retries=3, delay=60):
 
             if not video_status["can_comment"]:
                 logger.warning(f"Video {video_id} not ready for comments yet")
+                video_status = None  # force a fresh probe on the next attempt
                 if attempt < max_retries - 1:
-                    logger.info(f"Waiting {delay} seconds before retry...")
-                    time.sleep(delay)
+                    wait = delay * (2**attempt) + random.uniform(0, delay / 4)
+                    logger.info(f"Waiting {wait:.0f} seconds before retry...")
+                    time.sleep(wait)
                 continue
 
             yt = get_youtube_client()
+            # Only actual writes consume a token; skipped videos cost nothing
+            _comment_bucket.acquire()
             result = (
                 yt.commentThreads()
                 .insert(
@@ -393,124 +733,180 @@ def post_comment_with_retry(video_id, comment_body, max_retries=3, delay=60):
             logger.info(f"Comment posted successfully to video {video_id}")
             return True
 
-        except Exception as e:
-            error_msg = str(e)
-            logger.error(
-                f"Attempt {attempt + 1} failed for video {video_id}: {error_msg}"
-            )
+        except HttpError as e:
+            # Classify by the structured API reason codes instead of
+            # substring-matching str(e)
+            reasons = {
+                d.get("reason")
+                for d in (getattr(e, "error_details", None) or [])
+                if isinstance(d, dict)
+            }
+            status_code = e.resp.status if e.resp is not None else None
+            logger.error(f"Attempt {attempt + 1} failed for video {video_id}: {e}")
 
-            # Check for specific error types that indicate member-only content
-            if any(
-                indicator in error_msg.lower()
-                for indicator in [
-                    "commentsDisabled",
-                    "forbidden",
-                    "insufficientPermissions",
-                    "channelSubscriptionRequired",
-                ]
-            ):
+            if "quotaExceeded" in reasons or "rateLimitExceeded" in reasons:
+                logger.error("YouTube API quota exceeded")
+                return False
+            if status_code == 403 or reasons & {
+                "commentsDisabled",
+                "forbidden",
+                "insufficientPermissions",
+                "channelSubscriptionRequired",
+            }:
                 logger.info(
                     f"Video {video_id} appears to be member-only or comments disabled - skipping"
                 )
                 return "member_only"
-            elif "quotaExceeded" in error_msg:
-                logger.error("YouTube API quota exceeded")
-                return False
 
             if attempt < max_retries - 1:
-                logger.info(f"Waiting {delay} seconds before retry...")
-                time.sleep(delay)
+                wait = delay * (2**attempt) + random.uniform(0, delay / 4)
+                logger.info(f"Waiting {wait:.0f} seconds before retry...")
+                time.sleep(wait)
+            else:
+                logger.error(f"All {max_retries} attempts failed for video {video_id}")
+
+        except Exception as e:
+            logger.error(f"Attempt {attempt + 1} failed for video {video_id}: {e}")
+
+            if attempt < max_retries - 1:
+                wait = delay * (2**attempt) + random.uniform(0, delay / 4)
+                logger.info(f"Waiting {wait:.0f} seconds before retry...")
+                time.sleep(wait)
             else:
                 logger.error(f"All {max_retries} attempts failed for video {video_id}")
 
     return False
 
 
-def mark_video_as_processed(row_id, success=True, status="ended"):
-    """Mark video as processed with success status"""
+def mark_videos_as_processed_bulk(row_ids, success=True, status="ended"):
+    """Mark many videos as processed in a single PATCH.
+
+    All rows get the same marked/status payload, so one id=in.(...)
+    update replaces a round trip per row."""
+    if not row_ids:
+        return True
+
     try:
-        url = f"{SUPABASE_URL}/rest/v1/{SUPABASE_YT_TABLE}?id=eq.{row_id}"
-        headers = {
-            "apikey": SUPABASE_API_KEY,
-            "Authorization": f"Bearer {SUPABASE_API_KEY}",
-            "Content-Type": "application/json",
-        }
+        ids = ",".join(str(r) for r in row_ids)
+        url = f"{SUPABASE_URL}/rest/v1/{SUPABASE_YT_TABLE}?id=in.({ids})"
 
         data = {
             "marked": success,
             "status": status,
         }
 
-        resp = requests.patch(url, headers=headers, json=data, timeout=30)
+        resp = SUPABASE_SESSION.patch(
+            url,
+            headers={
+                "Content-Type": "application/json",
+                # 204 No Content instead of echoing the updated rows back
+                "Prefer": "return=minimal",
+            },
+            data=json_dumps(data),
+            timeout=30,
+        )
         resp.raise_for_status()
 
-        logger.info(f"Database updated for video {row_id} with status: {status}")
+        logger.info(f"Database updated for {len(row_ids)} video(s) with status: {status}")
         return True
 
     except requests.exceptions.RequestException as e:
-        logger.error(f"Request error updating database for video {row_id}: {e}")
+        logger.error(f"Request error updating database for videos {row_ids}: {e}")
         return False
     except Exception as e:
-        logger.error(f"Unexpected error updating database for video {row_id}: {e}")
+        logger.error(f"Unexpected error updating database for videos {row_ids}: {e}")
         return False
 
 
 def remove_custom_emojis(text):
     """Remove custom emoji patterns like :_EmojiName: from text"""
-    if not text:
-        return text
-    try:
-        return re.sub(r":_[^:]+:", "", text)
-    except Exception as e:
-        logger.error(f"Error removing custom emojis: {e}")
+    # Most messages contain no custom emoji; the substring check skips
+    # the regex scan (and its fresh string) for them
+    if not text or ":_" not in text:
         return text
+    return _EMOJI_RE.sub("", text)
 
 
 def remove_at_symbol(text):
     """Remove leading @ symbol from usernames (e.g., @Dhruvi -> Dhruvi)"""
     if not text:
         return text
-    try:
-        return text.lstrip("@")
-    except Exception as e:
-        logger.error(f"Error removing @ symbol: {e}")
-        return text
+    return text.lstrip("@") if text.startswith("@") else text
 
 
-def truncate_comment(comment_body, max_length=YOUTUBE_COMMENT_MAX_LENGTH):
-    """Truncate comment if it exceeds YouTube's character limit"""
-    if len(comment_body) <= max_length:
-        return comment_body
+def build_comment_body(lines):
+    """Assemble the comment, truncating on a line boundary when the full
+    body would exceed YouTube's limit.
 
-    # Find a good place to cut (try to avoid cutting in the middle of a timestamp line)
-    truncated = comment_body[: max_length - 100]  # Leave some buffer
-    last_newline = truncated.rfind("\n")
+    Summing line lengths against a budget before joining avoids building
+    an oversized string only to slice and rescan it afterwards."""
+    budget = (
+        YOUTUBE_COMMENT_MAX_LENGTH
+        - len(_COMMENT_HEADER)
+        - len(_COMMENT_FOOTER)
+        - len(_TRUNCATION_NOTICE)
+    )
 
-    if last_newline > 0:
-        truncated = truncated[:last_newline]
+    used = 0
+    for idx, line in enumerate(lines):
+        used += len(line) + 1  # +1 for the joining newline
+        if used > budget:
+            logger.warning(
+                f"Comment truncated to {idx} of {len(lines)} timestamp lines"
+            )
+            return (
+                _COMMENT_HEADER
+                + "\n".join(lines[:idx])
+                + _TRUNCATION_NOTICE
+                + _COMMENT_FOOTER
+            )
 
-    truncated += (
-        "\n\n[Comment truncated due to length limit]\n\nThank you for using Tsnip."
-    )
+    return _COMMENT_HEADER + "\n".join(lines) + _COMMENT_FOOTER
 
-    logger.warning(
-        f"Comment truncated from {len(comment_body)} to {len(truncated)} characters"
-    )
-    return truncated
 
+def _format_line(m, start_ts, video_id):
+    """Build one "timestamp – message (by user)" comment line.
+
+    Returns None for malformed rows so callers can filter them out."""
+    # Cheap structural guard up front so incomplete rows never raise;
+    # the except below only backstops malformed timestamp strings and
+    # costs nothing on the non-raising path (zero-overhead try in 3.11+)
+    if not m.get("user_timestamp") or m.get("delay") is None:
+        logger.warning(f"Skipping incomplete message row for video {video_id}")
+        return None
+
+    try:
+        timestamp = format_timestamp(start_ts, m["user_timestamp"], m["delay"])
+        message = remove_custom_emojis(m.get("message", "").strip())
+        user = remove_at_symbol(m["user_name"])
+
+        if message:
+            return "%s – _%s_ (by %s)" % (timestamp, message, user)
+        return "%s – (by %s)" % (timestamp, user)
+    except Exception as e:
+        logger.error(f"Error processing message for video {video_id}: {e}")
+        return None
 
-def process_single_video(row, video_index, total_videos):
+
+def process_single_video(row, video_index, total_videos, video_data=None, messages=None):
     """Process a single video with comprehensive error handling"""
     try:
         video_id = row["video_id"]
-        uuid = row["id"]
         chat_id = row["chat_id"]
         start_time = row["stream_start_time"]
 
         logger.info(f"[{video_index}/{total_videos}] Processing video {video_id}")
 
-        # Check if video is ready for comments
-        video_status = is_video_ready_for_comments(video_id)
+        # No messages means nothing to post, so bail out before spending
+        # the status probe and member-only page scrape on this video
+        if messages is None:
+            messages = get_chat_messages(chat_id)
+        if not messages:
+            logger.warning(f"No messages found for chat {chat_id}")
+            return False
+
+        # Check if video is ready for comments (batched data when available)
+        video_status = is_video_ready_for_comments(video_id, video_data)
 
         if video_status["is_live"]:
             logger.info(
@@ -519,80 +915,48 @@ def process_single_video(row, video_index, total_videos):
             return False  # Don't mark as processed, will retry later
 
         if video_status["is_member_only"]:
-            # Member-only video, skip comment but mark as processed
-            if mark_video_as_processed(uuid, success=True, status="member_only"):
-                logger.info(
-                    f"Skipped member-only video {video_id} and marked as processed"
-                )
-                return True
-            else:
-                logger.error(
-                    f"Failed to mark member-only video {video_id} as processed in database"
-                )
-                return False
+            # Member-only video: skip the comment; the handler batches the
+            # database update with the other processed rows
+            logger.info(f"Skipping member-only video {video_id}")
+            return "member_only"
 
         if not video_status["can_comment"]:
             logger.warning(f"Video {video_id} is not ready for comments - skipping")
             return False
 
-        # Get chat messages
-        messages = get_chat_messages(chat_id)
-        if not messages:
-            logger.warning(f"No messages found for chat {chat_id}")
-            return False
-
         logger.info(f"Found {len(messages)} chat messages")
 
-        # Format timestamps
-        lines = []
-        for m in messages:
-            try:
-                timestamp = format_timestamp(
-                    start_time, m["user_timestamp"], m["delay"]
-                )
-                message = m.get("message", "").strip()
-                user = m["user_name"]
-
-                # Clean member emojis and @ symbols from user name
-                message = remove_custom_emojis(message)
-                user = remove_at_symbol(user)
+        # Parse the stream start once; every message reuses the epoch value
+        try:
+            start_ts = _parse_utc(start_time).timestamp()
+        except Exception as e:
+            logger.error(f"Invalid stream_start_time for video {video_id}: {e}")
+            return False
 
-                # Add to comment lines
-                if message:
-                    lines.append(f"{timestamp} – _{message}_ (by {user})")
-                else:
-                    lines.append(f"{timestamp} – (by {user})")
-            except Exception as e:
-                logger.error(f"Error processing message for video {video_id}: {e}")
-                continue
+        # Format timestamps; bad rows come back as None and are dropped
+        lines = [
+            line
+            for m in messages
+            if (line := _format_line(m, start_ts, video_id)) is not None
+        ]
 
         if not lines:
             logger.warning(f"No valid timestamp lines generated for video {video_id}")
             return False
 
-        # Post YouTube comment
-        comment_body = (
-            "Time stamps:\n\n" + "\n".join(lines) + "\n\nThank you for using Tsnip."
-        )
-
-        # Truncate if necessary
-        comment_body = truncate_comment(comment_body)
+        # Post YouTube comment; truncation happens on line boundaries
+        # before the join, so no oversized intermediate string is built
+        comment_body = build_comment_body(lines)
 
         logger.info(f"Comment length: {len(comment_body)} characters")
 
-        # Post comment with retry logic
-        result = post_comment_with_retry(video_id, comment_body)
+        # Post comment with retry logic, reusing the status checked above
+        result = post_comment_with_retry(video_id, comment_body, video_status)
 
         if result is True:
-            # Successfully posted comment
-            if mark_video_as_processed(uuid, success=True, status="ended"):
-                logger.info(f"Successfully processed video {video_id}")
-                return True
-            else:
-                logger.error(
-                    f"Failed to mark video {video_id} as processed in database"
-                )
-                return False
+            # Comment posted; the handler batches the database update
+            logger.info(f"Successfully processed video {video_id}")
+            return "ended"
         else:
             # Failed to post comment
             logger.error(f"Failed to process video {video_id} - will retry later")
@@ -613,35 +977,73 @@ def handler():
         # Validate environment variables
         validate_environment()
 
-        # Get unmarked streams
-        unmarked_streams = get_unmarked_streams()
+        # Get unmarked streams and their messages in one joined call when
+        # the RPC is deployed; otherwise the separate queries below
+        messages_map = None
+        joined = fetch_unmarked_with_messages()
+        if joined is not None:
+            unmarked_streams, messages_map = joined
+        else:
+            unmarked_streams = get_unmarked_streams()
         if not unmarked_streams:
             logger.info("No unmarked streams found")
             return
 
         logger.info(f"Found {len(unmarked_streams)} unmarked streams")
 
-        # Process each video
+        # Process videos concurrently — each one is a chain of blocking
+        # Supabase/YouTube round trips, so the bounded pool turns
+        # N * sum(latencies) into roughly N / workers
         processed_count = 0
         failed_count = 0
+        total = len(unmarked_streams)
 
-        for i, row in enumerate(unmarked_streams, 1):
-            try:
-                # Add small delay between videos to avoid rate limiting
-                if i > 1:
-                    time.sleep(2)
+        # One batched videos.list per 50 ids replaces a per-video status probe
+        video_data_map = fetch_video_data_bulk(
+            [row["video_id"] for row in unmarked_streams]
+        )
 
-                success = process_single_video(row, i, len(unmarked_streams))
+        # Likewise one in.(...) select replaces a per-chat message fetch
+        if messages_map is None:
+            messages_map = get_chat_messages_bulk(
+                [row["chat_id"] for row in unmarked_streams]
+            )
 
-                if success:
-                    processed_count += 1
+        # status -> row ids awaiting the same database update
+        to_mark = {}
+
+        with ThreadPoolExecutor(max_workers=MONITOR_MAX_WORKERS) as pool:
+            futures = [
+                pool.submit(
+                    process_single_video,
+                    row,
+                    i,
+                    total,
+                    video_data_map.get(row["video_id"]),
+                    messages_map.get(row["chat_id"]),
+                )
+                for i, row in enumerate(unmarked_streams, 1)
+            ]
+
+            for i, (future, row) in enumerate(zip(futures, unmarked_streams), 1):
+                try:
+                    outcome = future.result()
+                except Exception as e:
+                    logger.error(f"Critical error processing video {i}: {e}")
+                    failed_count += 1
+                    continue
+
+                if outcome:
+                    to_mark.setdefault(outcome, []).append(row["id"])
                 else:
                     failed_count += 1
 
-            except Exception as e:
-                logger.error(f"Critical error processing video {i}: {e}")
-                failed_count += 1
-                continue
+        # One PATCH per distinct status instead of one per video
+        for status, row_ids in to_mark.items():
+            if mark_videos_as_processed_bulk(row_ids, status=status):
+                processed_count += len(row_ids)
+            else:
+                failed_count += len(row_ids)
 
         logger.info(
             f"Processing complete! Processed: {processed_count}, Failed: {failed_count}"
@@ -1,11 +1,16 @@
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import time
 from dotenv import load_dotenv
 from datetime import datetime
 import threading
 import queue
+import heapq
+import itertools
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 # Load environment variables
 load_dotenv()
@@ -16,18 +21,167 @@ YT_DATA_API_V3 = os.getenv("YT_DATA_API_V3")
 SUPABASE_YT_TABLE = os.getenv("SUPABASE_YT_TABLE")
 BLACKLIST_YT_CHANNEL = os.getenv("blacklist_yt_channel")
 
+# Transient failures (and 429s, honouring Retry-After) are retried at
+# the transport with exponential backoff instead of being swallowed by
+# the per-call except blocks
+# POST is retried too: the upsert path is idempotent (ignore-duplicates
+# on the unique pair) and the fallback insert only runs after an
+# existence check, so a replay can at worst duplicate a row whose
+# response was lost mid-flight
+_RETRY = Retry(
+    total=3,
+    backoff_factor=0.5,
+    status_forcelist=(429, 500, 502, 503, 504),
+    allowed_methods=frozenset({"GET", "POST"}),
+    respect_retry_after_header=True,
+)
+
+# Shared keep-alive sessions, one per credential domain (same split as
+# api/monitor_streams.py): the Supabase key never rides a YouTube call
+SUPABASE_SESSION = requests.Session()
+SUPABASE_SESSION.mount(
+    "https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=_RETRY)
+)
+SUPABASE_SESSION.headers.update(
+    {
+        "apikey": SUPABASE_API_KEY,
+        "Authorization": f"Bearer {SUPABASE_API_KEY}",
+    }
+)
+
+YT_SESSION = requests.Session()
+YT_SESSION.mount(
+    "https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=_RETRY)
+)
+
 youtube_queue = queue.Queue()
 
+# How long a cached channel_id -> title mapping stays fresh
+CHANNEL_NAME_TTL = 3600
+
 # Set up logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
 
+# orjson decodes the YouTube/Supabase payloads 2-3x faster than the
+# stdlib; fall back silently when it is not installed (same shim as
+# api/monitor_streams.py)
+try:
+    import orjson
+
+    def json_loads(data):
+        return orjson.loads(data)
+
+    def json_dumps(obj):
+        return orjson.dumps(obj)
+
+except ImportError:
+    import json as _stdlib_json
+
+    def json_loads(data):
+        return _stdlib_json.loads(data)
+
+    def json_dumps(obj):
+        return _stdlib_json.dumps(obj).encode("utf-8")
+
 
 class YouTubeStreamProcessor:
     def __init__(self):
         self.processing = False
+        # Small shared pool for firing independent API calls in parallel
+        self._executor = ThreadPoolExecutor(max_workers=4)
+        # Cleared the first time PostgREST rejects on_conflict (i.e. the
+        # table has no unique (chat_id, video_id) index)
+        self._upsert_supported = True
+        # Every (chat_id, video_id) pair we have successfully stored;
+        # repeat polls of the same channel skip the write entirely
+        self._inserted_keys = set()
+        self._inserted_lock = threading.Lock()
+        # One long-lived scheduler thread drains this heap of delayed
+        # enqueues instead of spawning a Timer thread per request
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._pending_event = threading.Event()
+        self._pending_seq = itertools.count()
+        self._sched_thread = None
+        # channel_id -> (fetched_at, title); channel names change rarely,
+        # so one /channels round trip per hour per channel is plenty
+        self._channel_names = {}
+        self._channel_names_lock = threading.Lock()
+        # channel_id -> uploads playlist id; immutable, cached forever
+        self._uploads_playlists = {}
+        # (chat_id, channel_id) pairs currently scheduled or queued;
+        # bursts for the same channel collapse into one poll
+        self._queued = set()
+        self._queued_lock = threading.Lock()
+
+    def _get_channel_name(self, channel_id, timeout=10):
+        """Fetch a channel's title, cached for an hour per channel.
+
+        Also records the channel's uploads playlist id (immutable, so
+        cached without expiry). Returns None when the channel does not
+        exist. Raises on network errors so callers keep their existing
+        error handling."""
+        now = time.time()
+        with self._channel_names_lock:
+            cached = self._channel_names.get(channel_id)
+            if cached and now - cached[0] < CHANNEL_NAME_TTL:
+                return cached[1]
+
+        channel_resp = YT_SESSION.get(
+            "https://www.googleapis.com/youtube/v3/channels",
+            params={
+                "part": "snippet,contentDetails",
+                "id": channel_id,
+                "key": YT_DATA_API_V3,
+            },
+            timeout=timeout,
+        )
+        channel_resp.raise_for_status()
+        items = json_loads(channel_resp.content).get("items", [])
+        if not items:
+            return None
+
+        channel_name = items[0]["snippet"]["title"]
+        uploads = (
+            items[0]
+            .get("contentDetails", {})
+            .get("relatedPlaylists", {})
+            .get("uploads")
+        )
+        with self._channel_names_lock:
+            self._channel_names[channel_id] = (now, channel_name)
+            if uploads:
+                self._uploads_playlists[channel_id] = uploads
+        return channel_name
+
+    def _get_recent_video_ids(self, channel_id, timeout=10, max_results=10):
+        """Latest upload ids via the channel's uploads playlist.
+
+        playlistItems.list costs 1 quota unit where a search.list call
+        costs 100, and live/completed broadcasts appear in the uploads
+        playlist like any other video."""
+        playlist_id = self._uploads_playlists.get(channel_id)
+        if not playlist_id:
+            return []
+
+        resp = YT_SESSION.get(
+            "https://www.googleapis.com/youtube/v3/playlistItems",
+            params={
+                "part": "contentDetails",
+                "playlistId": playlist_id,
+                "maxResults": max_results,
+                "key": YT_DATA_API_V3,
+            },
+            timeout=timeout,
+        )
+        resp.raise_for_status()
+        return [
+            item["contentDetails"]["videoId"]
+            for item in json_loads(resp.content).get("items", [])
+        ]
 
     def get_live_streams(self, nightbot_chatid, channel_id, timeout=10):
         if not YT_DATA_API_V3:
@@ -37,126 +191,26 @@ class YouTubeStreamProcessor:
                 "error": "No API key",
             }
 
-        streams = []
-
         try:
-            # Get channel name
-            channel_url = "https://www.googleapis.com/youtube/v3/channels"
-            channel_params = {
-                "part": "snippet",
-                "id": channel_id,
-                "key": YT_DATA_API_V3,
-            }
-            channel_resp = requests.get(
-                channel_url, params=channel_params, timeout=timeout
-            )
-            channel_resp.raise_for_status()
-            items = channel_resp.json().get("items", [])
-            if not items:
+            channel_name = self._get_channel_name(channel_id, timeout)
+            if channel_name is None:
                 return {
                     "nightbot_chatid": nightbot_chatid,
                     "streams": [],
                     "error": "Channel not found",
                 }
-
-            channel_name = items[0]["snippet"]["title"]
-            logger.info(f"Found channel: {channel_name}")
-
-            # Try event types - prioritize live, then completed
-            for event_type in ["live", "completed"]:
-                logger.info(f"Searching for {event_type} streams...")
-                search_url = "https://www.googleapis.com/youtube/v3/search"
-                search_params = {
-                    "part": "snippet",
-                    "channelId": channel_id,
-                    "type": "video",
-                    "eventType": event_type,
-                    "key": YT_DATA_API_V3,
-                    "maxResults": 5,
-                    "order": "date",
-                }
-
-                try:
-                    resp = requests.get(
-                        search_url, params=search_params, timeout=timeout
-                    )
-                    resp.raise_for_status()
-                    videos = resp.json().get("items", [])
-
-                    # Collect video IDs for batch processing
-                    video_ids = [video["id"]["videoId"] for video in videos]
-
-                    # Get live streaming details for all videos in batch
-                    streaming_details = {}
-                    if video_ids:
-                        video_details_url = (
-                            "https://www.googleapis.com/youtube/v3/videos"
-                        )
-                        video_details_params = {
-                            "part": "liveStreamingDetails",
-                            "id": ",".join(video_ids),
-                            "key": YT_DATA_API_V3,
-                        }
-
-                        try:
-                            details_resp = requests.get(
-                                video_details_url,
-                                params=video_details_params,
-                                timeout=timeout,
-                            )
-                            details_resp.raise_for_status()
-                            details_items = details_resp.json().get("items", [])
-
-                            for item in details_items:
-                                video_id = item["id"]
-                                live_details = item.get("liveStreamingDetails", {})
-                                streaming_details[video_id] = {
-                                    "start_time": live_details.get("actualStartTime"),
-                                    "end_time": live_details.get("actualEndTime"),
-                                }
-                        except requests.exceptions.RequestException as e:
-                            logger.error(
-                                f"Error getting live streaming details: {str(e)}"
-                            )
-                            # Continue without streaming details if this fails
-
-                    for video in videos:
-                        video_id = video["id"]["videoId"]
-                        stream_info = {
-                            "video_id": video_id,
-                            "title": video["snippet"]["title"],
-                            "status": event_type,
-                            "url": f"https://www.youtube.com/watch?v={video_id}",
-                            "channel": channel_name,
-                            "channel_id": channel_id,
-                        }
-
-                        # Add streaming details if available
-                        if video_id in streaming_details:
-                            stream_info["start_time"] = streaming_details[video_id][
-                                "start_time"
-                            ]
-                            stream_info["end_time"] = streaming_details[video_id][
-                                "end_time"
-                            ]
-                        else:
-                            stream_info["start_time"] = None
-                            stream_info["end_time"] = None
-
-                        streams.append(stream_info)
-
-                    if streams:
-                        logger.info(f"Found {len(streams)} {event_type} streams")
-                        break  # Stop after finding streams of the first available type
-
-                except requests.exceptions.RequestException as e:
-                    logger.error(f"Error searching for {event_type} streams: {str(e)}")
-                    continue
-                except Exception as e:
-                    logger.error(
-                        f"Unexpected error searching for {event_type} streams: {str(e)}"
-                    )
-                    continue
+            logger.debug("Found channel: %s", channel_name)
+
+            # Page the uploads playlist (1 quota unit) and hydrate with
+            # one videos.list (1 unit) instead of the old pair of
+            # search.list calls at 100 units each
+            video_ids = self._get_recent_video_ids(channel_id, timeout)
+            details = self._fetch_video_details(video_ids, timeout)
+            streams = self._streams_from_details(
+                channel_id,
+                channel_name,
+                [details[v] for v in video_ids if v in details],
+            )
 
             return {"nightbot_chatid": nightbot_chatid, "streams": streams}
 
@@ -171,17 +225,97 @@ class YouTubeStreamProcessor:
             logger.error(f"Error getting streams for channel {channel_id}: {str(e)}")
             return {"nightbot_chatid": nightbot_chatid, "streams": [], "error": str(e)}
 
+    def _fetch_video_details(self, video_ids, timeout=10):
+        """video_id -> videos.list item, batched 50 ids per call.
+
+        videos.list takes up to 50 comma-separated ids for 1 quota
+        unit, so candidates from several queued channels can share one
+        round trip."""
+        details = {}
+        for i in range(0, len(video_ids), 50):
+            resp = YT_SESSION.get(
+                "https://www.googleapis.com/youtube/v3/videos",
+                params={
+                    "part": "snippet,liveStreamingDetails",
+                    "id": ",".join(video_ids[i : i + 50]),
+                    "key": YT_DATA_API_V3,
+                },
+                timeout=timeout,
+            )
+            resp.raise_for_status()
+            for item in json_loads(resp.content).get("items", []):
+                details[item["id"]] = item
+        return details
+
+    @staticmethod
+    def _streams_from_details(channel_id, channel_name, detail_items):
+        by_status = {"live": [], "completed": []}
+        for item in detail_items:
+            live_details = item.get("liveStreamingDetails")
+            if not live_details:
+                continue  # plain upload, never a broadcast
+
+            broadcast = item["snippet"].get("liveBroadcastContent")
+            if broadcast == "live":
+                status = "live"
+            elif live_details.get("actualEndTime"):
+                status = "completed"
+            else:
+                continue  # upcoming / never started
+
+            video_id = item["id"]
+            by_status[status].append(
+                {
+                    "video_id": video_id,
+                    "title": item["snippet"]["title"],
+                    "status": status,
+                    "url": f"https://www.youtube.com/watch?v={video_id}",
+                    "channel": channel_name,
+                    "channel_id": channel_id,
+                    "start_time": live_details.get("actualStartTime"),
+                    "end_time": live_details.get("actualEndTime"),
+                }
+            )
+
+        # Same priority as before: live streams win outright, completed
+        # ones only matter when nothing is live
+        for status in ("live", "completed"):
+            if by_status[status]:
+                logger.info("Found %d %s streams", len(by_status[status]), status)
+                return by_status[status]
+        return []
+
+    def check_existing_streams_batch(self, chat_id, video_ids):
+        """Return the set of video_ids already stored for this chat.
+
+        One video_id=in.(...) select replaces a round trip per video. On
+        failure returns None so callers can fall back to per-video
+        checks."""
+        if not video_ids:
+            return set()
+        try:
+            url = (
+                f"{SUPABASE_URL}/rest/v1/{SUPABASE_YT_TABLE}"
+                f"?chat_id=eq.{chat_id}&video_id=in.({','.join(video_ids)})"
+                "&select=video_id"
+            )
+            resp = SUPABASE_SESSION.get(url, timeout=10)
+            if resp.status_code == 200:
+                return {r["video_id"] for r in json_loads(resp.content)}
+            logger.warning(
+                f"Failed batched existing-stream check: {resp.status_code}"
+            )
+        except Exception as e:
+            logger.error(f"Error in batched existing-stream check: {str(e)}")
+        return None
+
     def check_existing_streams(self, chat_id, video_id):
-        headers = {
-            "apikey": SUPABASE_API_KEY,
-            "Authorization": f"Bearer {SUPABASE_API_KEY}",
-        }
         try:
             url = f"{SUPABASE_URL}/rest/v1/{SUPABASE_YT_TABLE}?chat_id=eq.{chat_id}&video_id=eq.{video_id}"
-            resp = requests.get(url, headers=headers)
+            resp = SUPABASE_SESSION.get(url, timeout=10)
             if resp.status_code == 200:
-                exists = len(resp.json()) > 0
-                logger.debug(f"Stream {video_id} exists: {exists}")
+                exists = len(json_loads(resp.content)) > 0
+                logger.debug("Stream %s exists: %s", video_id, exists)
                 return exists
             else:
                 logger.warning(
@@ -191,58 +325,130 @@ class YouTubeStreamProcessor:
             logger.error(f"Error checking existing stream {video_id}: {str(e)}")
         return False
 
+    def _remember_inserted(self, chat_id, streams):
+        """Record stored pairs so later polls skip the write"""
+        with self._inserted_lock:
+            if len(self._inserted_keys) > 50_000:
+                self._inserted_keys.clear()
+            self._inserted_keys.update(
+                f"{chat_id}:{s['video_id']}" for s in streams
+            )
+
+    @staticmethod
+    def _build_record(chat_id, stream):
+        record = {
+            "chat_id": chat_id,
+            "video_id": stream["video_id"],
+            "title": stream["title"],
+            "status": stream["status"],
+            "url": stream["url"],
+            "channel": stream["channel"],
+            "channel_id": stream["channel_id"],
+            "marked": False,
+        }
+
+        # Add stream timing information if available
+        if stream.get("start_time"):
+            record["stream_start_time"] = stream["start_time"]
+
+        return record
+
     def insert_yt_streams_to_supabase(self, streams_data):
         if not streams_data.get("streams"):
             logger.info(
-                f"No streams found for chat_id: {streams_data['nightbot_chatid']}"
+                "No streams found for chat_id: %s",
+                streams_data["nightbot_chatid"],
             )
             return False
 
-        headers = {
-            "apikey": SUPABASE_API_KEY,
-            "Authorization": f"Bearer {SUPABASE_API_KEY}",
-            "Content-Type": "application/json",
-            "Prefer": "return=representation",
-        }
+        chat_id = streams_data["nightbot_chatid"]
+
+        # Drop pairs this process already stored; the set is exact (no
+        # Bloom false positives) and bounded by the clear below
+        with self._inserted_lock:
+            streams = [
+                s
+                for s in streams_data["streams"]
+                if f"{chat_id}:{s['video_id']}" not in self._inserted_keys
+            ]
+        if not streams:
+            logger.debug("All streams already stored for chat_id: %s", chat_id)
+            return True
+        streams_data = {**streams_data, "streams": streams}
+
+        # Preferred path: one idempotent upsert — the server skips rows
+        # whose (chat_id, video_id) already exist, so no existence check
+        # and no check-then-insert race. Requires a unique index on that
+        # pair; if the table lacks it PostgREST rejects on_conflict and
+        # we fall back to the batched-check path below for good.
+        if self._upsert_supported:
+            records = [
+                self._build_record(chat_id, s) for s in streams_data["streams"]
+            ]
+            try:
+                resp = SUPABASE_SESSION.post(
+                    f"{SUPABASE_URL}/rest/v1/{SUPABASE_YT_TABLE}"
+                    "?on_conflict=chat_id,video_id",
+                    headers={
+                        "Content-Type": "application/json",
+                        "Prefer": "resolution=ignore-duplicates,return=minimal",
+                    },
+                    data=json_dumps(records),
+                    timeout=10,
+                )
+                if resp.status_code in (200, 201, 204):
+                    logger.info(
+                        "✓ Upserted %d YouTube stream records", len(records)
+                    )
+                    self._remember_inserted(chat_id, streams)
+                    return True
+                logger.warning(
+                    f"Upsert not available ({resp.status_code}); "
+                    "falling back to check-then-insert"
+                )
+                self._upsert_supported = False
+            except Exception as e:
+                logger.error(f"✗ Error upserting streams: {str(e)}")
+                return False
+
+        existing = self.check_existing_streams_batch(
+            chat_id, [s["video_id"] for s in streams_data["streams"]]
+        )
 
         new_records = []
         for stream in streams_data["streams"]:
-            if not self.check_existing_streams(
-                streams_data["nightbot_chatid"], stream["video_id"]
-            ):
-                record = {
-                    "chat_id": streams_data["nightbot_chatid"],
-                    "video_id": stream["video_id"],
-                    "title": stream["title"],
-                    "status": stream["status"],
-                    "url": stream["url"],
-                    "channel": stream["channel"],
-                    "channel_id": stream["channel_id"],
-                    "marked": False,
-                }
-
-                # Add stream timing information if available
-                if stream.get("start_time"):
-                    record["stream_start_time"] = stream["start_time"]
-
-                new_records.append(record)
+            if existing is not None:
+                already_stored = stream["video_id"] in existing
             else:
-                logger.info(f"Stream {stream['video_id']} already exists, skipping...")
+                # Batched check failed; fall back to the per-video probe
+                already_stored = self.check_existing_streams(
+                    chat_id, stream["video_id"]
+                )
+            if not already_stored:
+                new_records.append(self._build_record(chat_id, stream))
+            else:
+                logger.debug("Stream %s already exists, skipping", stream["video_id"])
 
         if not new_records:
             logger.info(
-                f"No new streams to insert for chat_id: {streams_data['nightbot_chatid']}"
+                "No new streams to insert for chat_id: %s",
+                streams_data["nightbot_chatid"],
             )
             return True
 
         try:
-            resp = requests.post(
+            resp = SUPABASE_SESSION.post(
                 f"{SUPABASE_URL}/rest/v1/{SUPABASE_YT_TABLE}",
-                headers=headers,
-                json=new_records,
+                headers={
+                    "Content-Type": "application/json",
+                    "Prefer": "return=minimal",
+                },
+                data=json_dumps(new_records),
+                timeout=10,
             )
-            if resp.status_code == 201:
-                logger.info(f"✓ Inserted {len(new_records)} new YouTube stream records")
+            if resp.status_code in (201, 204):
+                logger.info("✓ Inserted %d new YouTube stream records", len(new_records))
+                self._remember_inserted(chat_id, streams)
                 return True
             else:
                 logger.error(f"✗ YouTube insert failed: {resp.text}")
@@ -253,7 +459,9 @@ class YouTubeStreamProcessor:
 
     def process_youtube_request(self, chat_id, channel_id):
         logger.info(
-            f"Processing YouTube request: chat_id={chat_id}, channel_id={channel_id}"
+            "Processing YouTube request: chat_id=%s, channel_id=%s",
+            chat_id,
+            channel_id,
         )
 
         # Check blacklist before doing anything else
@@ -282,49 +490,159 @@ class YouTubeStreamProcessor:
             logger.error(f"✗ Exception during YouTube processing: {str(e)}")
             return False
 
+    def process_youtube_batch(self, items):
+        """Process a drained batch of queue items together.
+
+        Uploads still need one playlistItems call per channel, but the
+        candidate ids from every channel in the batch share a single
+        batched videos.list before results fan back out to the
+        per-chat insert."""
+        jobs = []
+        all_ids = []
+        for item in items:
+            chat_id = item.get("chat_id")
+            channel_id = item.get("channel_id")
+            if not chat_id or not channel_id:
+                continue
+            if is_channel_blacklisted(channel_id):
+                logger.warning(f"Skipping blacklisted channel: {channel_id}")
+                continue
+            try:
+                channel_name = self._get_channel_name(channel_id)
+                if channel_name is None:
+                    logger.error(f"Channel not found: {channel_id}")
+                    continue
+                video_ids = self._get_recent_video_ids(channel_id)
+            except Exception as e:
+                logger.error(
+                    f"Error resolving channel {channel_id}: {str(e)}"
+                )
+                continue
+            jobs.append((chat_id, channel_id, channel_name, video_ids))
+            all_ids.extend(video_ids)
+
+        try:
+            details = self._fetch_video_details(all_ids)
+        except Exception as e:
+            logger.error(f"Error fetching video details: {str(e)}")
+            return
+
+        for chat_id, channel_id, channel_name, video_ids in jobs:
+            streams = self._streams_from_details(
+                channel_id,
+                channel_name,
+                [details[v] for v in video_ids if v in details],
+            )
+            try:
+                self.insert_yt_streams_to_supabase(
+                    {"nightbot_chatid": chat_id, "streams": streams}
+                )
+            except Exception as e:
+                logger.error(
+                    f"✗ Exception during YouTube processing: {str(e)}"
+                )
+
     def start_background_processor(self):
         if self.processing:
             logger.warning("Background processor already running")
             return
         self.processing = True
 
-        def worker():
+        def dispatcher():
             logger.info("YouTube background processor started")
             while self.processing:
                 try:
-                    item = youtube_queue.get(timeout=1)
-                    chat_id = item.get("chat_id")
-                    channel_id = item.get("channel_id")
-                    if chat_id and channel_id:
-                        self.process_youtube_request(chat_id, channel_id)
-                    youtube_queue.task_done()
+                    items = [youtube_queue.get(timeout=1)]
+                    # Drain whatever else is already waiting so their
+                    # videos.list calls can be coalesced
+                    while len(items) < 25:
+                        try:
+                            items.append(youtube_queue.get_nowait())
+                        except queue.Empty:
+                            break
+                    # Released here, not after processing, so a request
+                    # arriving mid-poll still gets a fresh look
+                    with self._queued_lock:
+                        for item in items:
+                            self._queued.discard(
+                                (item.get("chat_id"), item.get("channel_id"))
+                            )
+                    # Hand the batch to the pool and get straight back
+                    # to draining; the pool size caps concurrency
+                    self._executor.submit(self._run_batch, items)
                 except queue.Empty:
                     continue
                 except Exception as e:
                     logger.error(f"Background processing error: {str(e)}")
             logger.info("YouTube background processor stopped")
 
-        threading.Thread(target=worker, daemon=True).start()
+        threading.Thread(target=dispatcher, daemon=True).start()
+
+    def _run_batch(self, items):
+        try:
+            self.process_youtube_batch(items)
+        except Exception as e:
+            logger.error(f"Background processing error: {str(e)}")
+        finally:
+            for _ in items:
+                youtube_queue.task_done()
 
     def stop_background_processor(self):
         logger.info("Stopping background processor...")
         self.processing = False
 
+    def _scheduler_loop(self):
+        while True:
+            self._pending_event.clear()
+            now = time.monotonic()
+            wait = None
+
+            with self._pending_lock:
+                while self._pending and self._pending[0][0] <= now:
+                    _, _, item = heapq.heappop(self._pending)
+                    youtube_queue.put(item)
+                    logger.debug(
+                        "Added to YouTube queue: chat_id=%s, channel_id=%s",
+                        item["chat_id"],
+                        item["channel_id"],
+                    )
+                if self._pending:
+                    wait = self._pending[0][0] - now
+
+            # Woken early when a new item lands in the heap
+            self._pending_event.wait(wait)
+
     def add_to_queue(self, chat_id, channel_id, delay=5):
-        def delayed_add():
-            youtube_queue.put(
-                {
-                    "chat_id": chat_id,
-                    "channel_id": channel_id,
-                    "timestamp": datetime.now().isoformat(),
-                }
-            )
-            logger.info(
-                f"Added to YouTube queue: chat_id={chat_id}, channel_id={channel_id}"
+        key = (chat_id, channel_id)
+        with self._queued_lock:
+            if key in self._queued:
+                logger.debug(
+                    "Already queued, skipping: chat_id=%s, channel_id=%s",
+                    chat_id,
+                    channel_id,
+                )
+                return
+            self._queued.add(key)
+
+        item = {
+            "chat_id": chat_id,
+            "channel_id": channel_id,
+            "timestamp": datetime.now().isoformat(),
+        }
+
+        with self._pending_lock:
+            heapq.heappush(
+                self._pending,
+                (time.monotonic() + delay, next(self._pending_seq), item),
             )
+            if self._sched_thread is None:
+                self._sched_thread = threading.Thread(
+                    target=self._scheduler_loop, daemon=True
+                )
+                self._sched_thread.start()
 
-        threading.Timer(delay, delayed_add).start()
-        logger.info(f"Scheduled YouTube processing in {delay} seconds")
+        self._pending_event.set()
+        logger.debug("Scheduled YouTube processing in %s seconds", delay)
 
 
 # Global instance
@@ -335,14 +653,10 @@ def is_channel_blacklisted(channel_id):
     """Check if a channel ID is in the blacklist table"""
     try:
         url = f"{SUPABASE_URL}/rest/v1/{BLACKLIST_YT_CHANNEL}?channel_id=eq.{channel_id}&select=id"
-        headers = {
-            "apikey": SUPABASE_API_KEY,
-            "Authorization": f"Bearer {SUPABASE_API_KEY}",
-        }
 
-        response = requests.get(url, headers=headers, timeout=10)
+        response = SUPABASE_SESSION.get(url, timeout=10)
         response.raise_for_status()
-        data = response.json()
+        data = json_loads(response.content)
 
         return len(data) > 0
 
@@ -0,0 +1,16 @@
+# Gunicorn config for self-hosted deployments (Vercel ignores this and uses
+# @vercel/python). Run with:
+#
+#   gunicorn -c gunicorn.conf.py api.clip:app
+#
+# preload_app imports the app once in the master, so the Supabase/Discord
+# session pools and module parsing are COW-shared across forked workers.
+
+import multiprocessing
+
+workers = 2 * multiprocessing.cpu_count() + 1
+threads = 4
+worker_class = "gthread"
+preload_app = True
+keepalive = 65
+bind = "0.0.0.0:8000"